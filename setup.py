@@ -0,0 +1,19 @@
+import os
+from setuptools import setup, Extension
+
+# the compiled parser is optional: without Cython (or without the .pyx
+# in the sdist) the package installs as pure python and falls back to
+# the interpreted parser
+ext_modules = []
+if os.path.exists("vatspy_data/_parser.pyx"):
+    try:
+        from Cython.Build import cythonize
+        ext_modules = cythonize(["vatspy_data/_parser.pyx"])
+    except ImportError:
+        pass
+if not ext_modules and os.path.exists("vatspy_data/_parser.c"):
+    # sdists built with Cython ship the generated C file, which installs
+    # without Cython being available
+    ext_modules = [Extension("vatspy_data._parser", ["vatspy_data/_parser.c"])]
+
+setup(ext_modules=ext_modules)
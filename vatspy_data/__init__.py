@@ -1,12 +1,19 @@
+import hashlib
+import ijson
 import json
+import numpy as np
+import os
+import pickle
 import requests
-import time
-from collections import defaultdict
+import shapely
+import sys
+from array import array
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
 from logging import getLogger
-from shapely import centroid
-from shapely.geometry import shape
-from collections import deque
-from typing import Dict, DefaultDict, Any, List, Optional
+from threading import Lock
+from requests.adapters import HTTPAdapter
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 from .types import (
     Country,
     Airport,
@@ -17,237 +24,548 @@ from .types import (
     Boundaries,
     BoundingBox,
     Point,
-    ParserState
+    ParserState,
+    _ParseContext,
+    _idx_add,
+    _idx_first,
+    _idx_remove,
 )
 
 DEFAULT_DATA_PATH = "https://raw.githubusercontent.com/vatsimnetwork/vatspy-data-project/master/VATSpy.dat"
 DEFAULT_GEOJSON_PATH = "https://raw.githubusercontent.com/vatsimnetwork/vatspy-data-project/master/Boundaries.geojson"
+DEFAULT_CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+    "vatspy",
+)
 
 
 log = getLogger(__name__)
 
+try:
+    # orjson serializes the geometry dicts 2-3x faster than stdlib json
+    # and returns bytes, which shapely.from_geojson accepts as is
+    from orjson import dumps as _json_dumps
+except ImportError:
+    _json_dumps = json.dumps
+
+_CATEGORY_TO_STATE = {
+    "countries": ParserState.READ_COUNTRY,
+    "airports": ParserState.READ_AIRPORT,
+    "firs": ParserState.READ_FIR,
+    "uirs": ParserState.READ_UIR,
+    "idl": ParserState.FINISHED,
+}
+
+
+def _parse_country(line: str, ctx: _ParseContext):
+    try:
+        name, code, custom_radar = line.split("|")
+    except ValueError:
+        log.error("invalid country line '%s'", line)
+        return
+
+    code = sys.intern(code)
+    i = ctx.country_name_idx.get(name)
+    if i is None:
+        i = len(ctx.countries)
+        ctx.country_name_idx[name] = i
+        kwargs = dict(name=name, codes=[code])
+        if custom_radar:
+            kwargs["radar_name"] = custom_radar
+        ctx.countries.append(Country(**kwargs))
+    else:
+        ctx.countries[i].codes.append(code)
+    ctx.country_idx[code] = i
+
+
+def _parse_airport(line: str, ctx: _ParseContext):
+    try:
+        icao, name, lat, lng, iata, fir_id, is_pseudo = line.split("|")
+    except ValueError:
+        log.error("invalid airport line '%s'", line)
+        return
+
+    airport = Airport(
+        icao=icao,
+        name=name,
+        lat=float(lat),
+        lng=float(lng),
+        iata=sys.intern(iata) if iata else None,
+        fir_id=sys.intern(fir_id),
+        pseudo=is_pseudo == "1"
+    )
+
+    i = ctx.airport_icao_idx.get(icao)
+    if i is None:
+        i = len(ctx.airports)
+        ctx.airports.append(airport)
+        ctx.airport_icao_idx[icao] = i
+        if airport.iata is not None:
+            _idx_add(ctx.airport_iata_idx, airport.iata, i)
+    else:
+        # a repeated icao replaces the earlier record in place
+        old = ctx.airports[i]
+        ctx.airports[i] = airport
+        if old.iata != airport.iata:
+            if old.iata is not None:
+                _idx_remove(ctx.airport_iata_idx, old.iata, i)
+            if airport.iata is not None:
+                _idx_add(ctx.airport_iata_idx, airport.iata, i)
+
+
+def _parse_fir(line: str, ctx: _ParseContext):
+    try:
+        icao, name, callsign_prefix, geom_id = line.split("|")
+    except ValueError:
+        log.error("invalid FIR line '%s'", line)
+        return
+
+    icao = sys.intern(icao)
+    fir = FIR(
+        icao=icao,
+        name=name,
+        callsign_prefix=sys.intern(callsign_prefix),
+        geom_id=geom_id,
+    )
+
+    i = ctx.fir_icao_idx.get(icao)
+    if i is None:
+        i = len(ctx.firs)
+        ctx.firs.append(fir)
+        ctx.fir_icao_idx[icao] = i
+    else:
+        old = ctx.firs[i]
+        ctx.firs[i] = fir
+        if old.callsign_prefix != fir.callsign_prefix \
+                and ctx.fir_prefix_idx.get(old.callsign_prefix) == i:
+            del ctx.fir_prefix_idx[old.callsign_prefix]
+    ctx.fir_prefix_idx[fir.callsign_prefix] = i
+
+
+def _parse_uir(line: str, ctx: _ParseContext):
+    try:
+        icao, name, firs_list = line.split("|")
+    except ValueError:
+        log.error("invalid UIR line '%s'", line)
+        return
+
+    uir = UIR(
+        icao=icao,
+        name=name,
+        fir_ids=[sys.intern(f) for f in firs_list.split(",")]
+    )
+
+    i = ctx.uir_icao_idx.get(icao)
+    if i is None:
+        i = len(ctx.uirs)
+        ctx.uirs.append(uir)
+        ctx.uir_icao_idx[icao] = i
+    else:
+        old = ctx.uirs[i]
+        ctx.uirs[i] = uir
+        for fir_id in old.fir_ids:
+            if ctx.uir_fir_idx.get(fir_id) == i:
+                del ctx.uir_fir_idx[fir_id]
+    for fir_id in uir.fir_ids:
+        ctx.uir_fir_idx[fir_id] = i
+
+
+def _parse_data(raw_data: str) -> _ParseContext:
+    ctx = _ParseContext()
+
+    handlers = {
+        ParserState.READ_COUNTRY: partial(_parse_country, ctx=ctx),
+        ParserState.READ_AIRPORT: partial(_parse_airport, ctx=ctx),
+        ParserState.READ_FIR: partial(_parse_fir, ctx=ctx),
+        ParserState.READ_UIR: partial(_parse_uir, ctx=ctx),
+    }
+
+    # the handler is picked once per section header, so a data line costs
+    # a strip, two char checks and one call
+    current_handler = None
+    for raw_line in raw_data.splitlines():
+        line = raw_line.strip()
+        if not line or line[0] == ";":
+            continue
+
+        if line[0] == "[":
+            category = line[1:-1].lower()
+            state = _CATEGORY_TO_STATE.get(category)
+            if state is ParserState.FINISHED:
+                break
+            if state is None:
+                log.error("unknown category %s", category)
+            current_handler = handlers.get(state)
+            continue
+
+        if current_handler is not None:
+            current_handler(line)
+
+    return ctx
+
+
+try:
+    # the compiled parser mirrors _parse_data, see _parser.pyx
+    from ._parser import parse_data
+except ImportError:
+    parse_data = _parse_data
+
 
 class VatspyData:
     _data_path: str
     _geojson_path: str
+    _cache_dir: Optional[str]
+    _fetched: Dict[str, Future]
+    _fetch_lock: Lock
+    _session: requests.Session
+    _geo_loaded: bool
 
     _countries: List[Country]
     _airports: List[Airport]
     _firs: List[FIR]
     _uirs: List[UIR]
 
+    _airport_lat: np.ndarray
+    _airport_lng: np.ndarray
+
+    _fir_tree: Optional[shapely.STRtree]
+    _fir_tree_idx: List[int]
+
     _country_idx: Dict[str, int]
-    _airport_icao_idx: DefaultDict[str, List[int]]
-    _airport_iata_idx: DefaultDict[str, List[int]]
-    _fir_icao_idx: DefaultDict[str, List[int]]
+    _airport_icao_idx: Dict[str, int]
+    _airport_iata_idx: Dict[str, int | array]
+    _fir_icao_idx: Dict[str, int]
     _fir_prefix_idx: Dict[str, int]
+    _fir_prefix_trie: Dict[str, Any]
     _uir_icao_idx: Dict[str, int]
     _uir_fir_idx: Dict[str, int]
 
     def __init__(self,
                  data_path: str = DEFAULT_DATA_PATH,
-                 geojson_path: str = DEFAULT_GEOJSON_PATH):
+                 geojson_path: str = DEFAULT_GEOJSON_PATH,
+                 cache_dir: Optional[str] = DEFAULT_CACHE_DIR,
+                 load_geometries: bool = False):
         self._reset()
         self._data_path = data_path
         self._geojson_path = geojson_path
-        self._load()
-        self._build_indexes()
+        self._cache_dir = cache_dir
+        self._fetched = {}
+        self._fetch_lock = Lock()
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=2)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+        # when geometries are wanted eagerly, warm up the geojson payload
+        # cache on a worker thread while VATSpy.dat is downloaded and parsed
+        prefetch_pool = None
+        if load_geometries and self._cache_dir is not None and self._is_http(self._geojson_path):
+            prefetch_pool = ThreadPoolExecutor(max_workers=1)
+            prefetch_pool.submit(self._fetch, self._geojson_path)
+
+        try:
+            if not self._load_parsed_cache():
+                self._load()
+                self._save_parsed_cache()
+            if load_geometries:
+                self._ensure_geometries()
+        finally:
+            if prefetch_pool is not None:
+                prefetch_pool.shutdown()
 
     def _load(self):
-        geo = self._load_geo()
         raw_data = self._load_data()
+        self._parse(raw_data)
+
+    def _ensure_geometries(self):
+        if self._geo_loaded:
+            return
+
+        geo_map = self._build_geo_map()
+        for fir in self._firs:
+            geom = geo_map.get(fir.geom_id)
+            if geom is None:
+                log.error("no geometry for FIR %s", fir.icao)
+                continue
+            fir._geom = geom
+        self._geo_loaded = True
+
+    def _build_geo_map(self) -> Dict[str, GeoItem]:
+        properties = []
+        geometries = []
+        for item in self._load_geo():
+            properties.append(item["properties"])
+            geometries.append(item["geometry"])
+
+        geoms = shapely.from_geojson(np.array([_json_dumps(g) for g in geometries], dtype=object))
+        centers = shapely.centroid(geoms)
+        bboxes = shapely.bounds(geoms)
 
         geo_map = {}
-        for item in geo["features"]:
-            item_id = item["properties"]["id"]
-            geom = shape(item["geometry"])
-            center = centroid(geom)
-            geo_map[item_id] = GeoItem(
-                properties=GeoItemProperties(**item["properties"]),
+        for props, geometry, geom, center, bbox in zip(properties, geometries, geoms, centers, bboxes):
+            geo_map[props["id"]] = GeoItem(
+                properties=GeoItemProperties(
+                    id=props["id"],
+                    oceanic=props["oceanic"] == "1",
+                    label_lon=float(props["label_lon"]),
+                    label_lat=float(props["label_lat"]),
+                    region=props["region"],
+                    division=props["division"],
+                ),
                 boundaries=Boundaries(
-                    geometry=item["geometry"],
+                    geometry=geometry,
+                    shape=geom,
                     bbox=BoundingBox(
-                        min=Point(lng=geom.bounds[0], lat=geom.bounds[1]),
-                        max=Point(lng=geom.bounds[2], lat=geom.bounds[3]),
+                        min=Point(lng=float(bbox[0]), lat=float(bbox[1])),
+                        max=Point(lng=float(bbox[2]), lat=float(bbox[3])),
                     ),
                     center=Point(lng=center.x, lat=center.y)
                 )
             )
-        self._parse(raw_data, geo_map)
-
-    def _build_indexes(self):
-        log.debug("building vatspy data indexes")
-        t1 = time.time()
-
-        self._country_idx = {}
-        for i, c in enumerate(self._countries):
-            for code in c.codes:
-                self._country_idx[code] = i
-
-        self._airport_icao_idx = defaultdict(list)
-        self._airport_iata_idx = defaultdict(list)
-
-        for i, a in enumerate(self._airports):
-            self._airport_icao_idx[a.icao].append(i)
-            if a.iata is not None:
-                self._airport_iata_idx[a.iata].append(i)
-
-        self._fir_icao_idx = defaultdict(list)
-        self._fir_prefix_idx = {}
-
-        for i, f in enumerate(self._firs):
-            self._fir_icao_idx[f.icao].append(i)
-            self._fir_prefix_idx[f.callsign_prefix] = i
-
-        self._uir_icao_idx = {}
-        self._uir_fir_idx = {}
-
-        for i, u in enumerate(self._uirs):
-            self._uir_icao_idx[u.icao] = i
-            for fir_id in u.fir_ids:
-                self._uir_fir_idx[fir_id] = i
-
-        t2 = time.time()
-        log.debug("vatspy data indexes built in %.3fs", t2 - t1)
-
-    def _parse(self, raw_data: str, geo_map: Dict[str, GeoItem]):
-        state = ParserState.STARTED
-        lines = deque(raw_data.split("\n"))
-
-        def category_to_state(category: str) -> Optional[ParserState]:
-            match category.lower():
-                case "countries":
-                    return ParserState.READ_COUNTRY
-                case "airports":
-                    return ParserState.READ_AIRPORT
-                case "firs":
-                    return ParserState.READ_FIR
-                case "uirs":
-                    return ParserState.READ_UIR
-                case "idl":
-                    return ParserState.FINISHED
-                case _:
-                    log.error("unknown category %s", category)
-                    return None
-
-        country_map = {}
-        airports = {}
-        firs = {}
-        uirs = {}
-
-        while lines and state != ParserState.FINISHED:
-            line = lines.popleft().strip()
-            if not line or line.startswith(";"):
+        return geo_map
+
+    def _build_fir_prefix_trie(self):
+        # character trie over the callsign prefixes, "$" marks a terminal
+        # node holding the FIR index
+        self._fir_prefix_trie = {}
+        for prefix, i in self._fir_prefix_idx.items():
+            if not prefix:
                 continue
+            node = self._fir_prefix_trie
+            for ch in prefix:
+                node = node.setdefault(ch, {})
+            node["$"] = i
 
-            if line.startswith("["):
-                category = line[1:-1].lower()
-                state = category_to_state(category)
-                continue
+    def _parse(self, raw_data: str):
+        ctx = parse_data(raw_data)
 
-            match state:
-                case ParserState.READ_COUNTRY:
-                    tokens = line.split("|")
-                    if len(tokens) != 3:
-                        log.error("invalid country line '%s'", line)
-                        continue
-                    name, code, custom_radar = tokens
-                    custom_radar = custom_radar or None
-                    if name not in country_map:
-                        kwargs = dict(name=name, codes=[code])
-                        if custom_radar:
-                            kwargs["radar_name"] = custom_radar
-                        country_map[name] = Country(**kwargs)
-                    else:
-                        country_map[name].codes.append(code)
-                case ParserState.READ_FIR:
-                    tokens = line.split("|")
-                    if len(tokens) != 4:
-                        log.error("invalid FIR line '%s'", line)
-                        continue
-
-                    icao, name, callsign_prefix, geom_id = tokens
-                    geom = geo_map.get(geom_id)
-                    if geom is None:
-                        log.error("no geometry for '%s'", line)
-                        continue
-
-                    fir = FIR(
-                        icao=icao,
-                        name=name,
-                        callsign_prefix=callsign_prefix,
-                        geom=geom,
-                    )
-                    firs[icao] = fir
-                case ParserState.READ_UIR:
-                    tokens = line.split("|")
-                    if len(tokens) != 3:
-                        log.error("invalid UIR line '%s'", line)
-                        continue
-
-                    icao, name, firs_list = tokens
-                    fir_ids = firs_list.split(",")
-
-                    uir = UIR(
-                        icao=icao,
-                        name=name,
-                        fir_ids=fir_ids
-                    )
-                    uirs[icao] = uir
-
-                case ParserState.READ_AIRPORT:
-                    tokens = line.split("|")
-                    if len(tokens) != 7:
-                        log.error("invalid airport line '%s'", line)
-                        continue
-                    icao, name, lat, lng, iata, fir_id, is_pseudo = tokens
-                    iata = iata or None
-                    airport = Airport(
-                        icao=icao,
-                        name=name,
-                        lat=lat,
-                        lng=lng,
-                        iata=iata,
-                        fir_id=fir_id,
-                        pseudo=is_pseudo
-                    )
-                    airports[icao] = airport
+        for c in ctx.countries:
+            c.codes = tuple(c.codes)
 
         self._reset()
-        self._countries = list(country_map.values())
-        self._airports = list(airports.values())
-        self._firs = list(firs.values())
-        self._uirs = list(uirs.values())
+        self._countries = ctx.countries
+        self._country_idx = ctx.country_idx
+        self._airports = ctx.airports
+        self._airport_icao_idx = ctx.airport_icao_idx
+        self._airport_iata_idx = ctx.airport_iata_idx
+        self._firs = ctx.firs
+        self._fir_icao_idx = ctx.fir_icao_idx
+        self._fir_prefix_idx = ctx.fir_prefix_idx
+        self._uirs = ctx.uirs
+        self._uir_icao_idx = ctx.uir_icao_idx
+        self._uir_fir_idx = ctx.uir_fir_idx
+        self._build_fir_prefix_trie()
+        self._attach_geom_loaders()
+        self._build_coord_arrays()
+
+    def _attach_geom_loaders(self):
+        for fir in self._firs:
+            fir._loader = self._ensure_geometries
+
+    def _build_coord_arrays(self):
+        n = len(self._airports)
+        self._airport_lat = np.fromiter((a.lat for a in self._airports), dtype=np.float64, count=n)
+        self._airport_lng = np.fromiter((a.lng for a in self._airports), dtype=np.float64, count=n)
 
     def _reset(self):
         self._countries = []
         self._airports = []
         self._firs = []
         self._uirs = []
+        self._airport_lat = np.empty(0, dtype=np.float64)
+        self._airport_lng = np.empty(0, dtype=np.float64)
+        self._geo_loaded = False
+        self._fir_tree = None
+        self._fir_tree_idx = []
         self._country_idx = {}
-        self._airport_icao_idx = defaultdict(list)
-        self._airport_iata_idx = defaultdict(list)
-        self._fir_icao_idx = defaultdict(list)
+        self._airport_icao_idx = {}
+        self._airport_iata_idx = {}
+        self._fir_icao_idx = {}
         self._fir_prefix_idx = {}
+        self._fir_prefix_trie = {}
         self._uir_icao_idx = {}
         self._uir_fir_idx = {}
 
-    def _load_geo(self) -> Dict[str, Any]:
-        use_http = self._geojson_path.startswith("http://") or self._geojson_path.startswith("https://")
-        if use_http:
-            resp = requests.get(self._geojson_path)
-            return resp.json()
+    @staticmethod
+    def _is_http(path: str) -> bool:
+        return path.startswith("http://") or path.startswith("https://")
+
+    def _cache_paths(self, url: str) -> Tuple[str, str]:
+        digest = hashlib.sha1(url.encode()).hexdigest()
+        base = os.path.join(self._cache_dir, digest)
+        return base + ".payload", base + ".etag"
+
+    def _parsed_cache_path(self) -> str:
+        return os.path.join(self._cache_dir, "parsed.pickle")
+
+    def _read_etag(self, url: str) -> Optional[str]:
+        etag_path = self._cache_paths(url)[1]
+        try:
+            with open(etag_path) as f:
+                return f.read().strip()
+        except OSError:
+            return None
+
+    def _fetch(self, url: str) -> Tuple[str, bool]:
+        """
+        downloads url into the cache directory using a conditional GET
+        and returns the payload file path along with a flag telling
+        whether the cached copy was still fresh
+
+        concurrent calls for the same url share a single download: the
+        first caller performs it and the rest wait on its future, so the
+        prefetch worker and the main thread never write the same payload
+        file at once
+        """
+        with self._fetch_lock:
+            future = self._fetched.get(url)
+            mine = future is None
+            if mine:
+                future = Future()
+                self._fetched[url] = future
+
+        if not mine:
+            return future.result()
+
+        try:
+            result = self._do_fetch(url)
+        except BaseException as e:
+            # failed downloads are not memoized, a later call may retry
+            with self._fetch_lock:
+                self._fetched.pop(url, None)
+            future.set_exception(e)
+            raise
+
+        future.set_result(result)
+        return result
+
+    def _do_fetch(self, url: str) -> Tuple[str, bool]:
+        payload_path, etag_path = self._cache_paths(url)
+        headers = {}
+        etag = self._read_etag(url)
+        if etag is not None and os.path.exists(payload_path):
+            headers["If-None-Match"] = etag
+
+        resp = self._session.get(url, headers=headers, stream=True)
+        if resp.status_code == 304:
+            log.debug("%s not modified, using the cached payload", url)
+            result = payload_path, True
+        else:
+            resp.raise_for_status()
+            os.makedirs(self._cache_dir, exist_ok=True)
+            # write-then-rename, like the parsed cache: a crash mid-stream
+            # must not leave a truncated payload next to a still-valid etag,
+            # or every later run would 304 onto the bad bytes
+            tmp_path = payload_path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                for chunk in resp.iter_content(65536):
+                    f.write(chunk)
+            os.replace(tmp_path, payload_path)
+            etag = resp.headers.get("ETag")
+            if etag:
+                with open(etag_path, "w") as f:
+                    f.write(etag)
+            elif os.path.exists(etag_path):
+                os.remove(etag_path)
+            result = payload_path, False
+
+        return result
+
+    def _load_parsed_cache(self) -> bool:
+        if self._cache_dir is None:
+            return False
+        if not self._is_http(self._data_path):
+            return False
+
+        _, data_fresh = self._fetch(self._data_path)
+        if not data_fresh:
+            return False
+
+        try:
+            with open(self._parsed_cache_path(), "rb") as f:
+                cached = pickle.load(f)
+        except OSError:
+            return False
+        except Exception:
+            # a truncated or foreign cache file must never break startup,
+            # anything unreadable just falls through to a re-parse
+            log.warning("discarding unreadable parsed cache %s", self._parsed_cache_path())
+            return False
+
+        if not isinstance(cached, dict) or cached.get("etag") != self._read_etag(self._data_path):
+            return False
+
+        self._countries = cached["countries"]
+        self._country_idx = cached["country_idx"]
+        self._airports = cached["airports"]
+        self._airport_icao_idx = cached["airport_icao_idx"]
+        self._airport_iata_idx = cached["airport_iata_idx"]
+        self._firs = cached["firs"]
+        self._fir_icao_idx = cached["fir_icao_idx"]
+        self._fir_prefix_idx = cached["fir_prefix_idx"]
+        self._uirs = cached["uirs"]
+        self._uir_icao_idx = cached["uir_icao_idx"]
+        self._uir_fir_idx = cached["uir_fir_idx"]
+        self._build_fir_prefix_trie()
+        self._attach_geom_loaders()
+        self._build_coord_arrays()
+        log.debug("loaded parsed vatspy data from cache")
+        return True
+
+    def _save_parsed_cache(self):
+        if self._cache_dir is None:
+            return
+
+        etag = self._read_etag(self._data_path)
+        if etag is None:
+            return
+
+        os.makedirs(self._cache_dir, exist_ok=True)
+        # write-then-rename so a crash mid-dump never leaves a truncated
+        # pickle behind
+        path = self._parsed_cache_path()
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump({
+                "etag": etag,
+                "countries": self._countries,
+                "country_idx": self._country_idx,
+                "airports": self._airports,
+                "airport_icao_idx": self._airport_icao_idx,
+                "airport_iata_idx": self._airport_iata_idx,
+                "firs": self._firs,
+                "fir_icao_idx": self._fir_icao_idx,
+                "fir_prefix_idx": self._fir_prefix_idx,
+                "uirs": self._uirs,
+                "uir_icao_idx": self._uir_icao_idx,
+                "uir_fir_idx": self._uir_fir_idx,
+            }, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    def _load_geo(self) -> Iterator[Dict[str, Any]]:
+        if self._is_http(self._geojson_path):
+            if self._cache_dir is not None:
+                payload_path, _ = self._fetch(self._geojson_path)
+                with open(payload_path, "rb") as f:
+                    yield from ijson.items(f, "features.item", use_float=True)
+            else:
+                resp = self._session.get(self._geojson_path, stream=True)
+                resp.raw.decode_content = True
+                yield from ijson.items(resp.raw, "features.item", use_float=True)
         else:
-            with open(self._geojson_path) as f:
-                return json.load(f)
+            with open(self._geojson_path, "rb") as f:
+                yield from ijson.items(f, "features.item", use_float=True)
 
     def _load_data(self):
-        use_http = self._data_path.startswith("http://") or self._data_path.startswith("https://")
-        if use_http:
-            resp = requests.get(self._data_path)
+        if self._is_http(self._data_path):
+            if self._cache_dir is not None:
+                payload_path, _ = self._fetch(self._data_path)
+                with open(payload_path, encoding="utf-8") as f:
+                    return f.read()
+            resp = self._session.get(self._data_path)
             return resp.text
         else:
-            with open(self._data_path) as f:
+            with open(self._data_path, encoding="utf-8") as f:
                 return f.read()
 
     def find_country_by_icao(self, icao: str) -> Optional[Country]:
@@ -264,15 +582,21 @@ class VatspyData:
 
     def find_fir_by_callsign(self, callsign: str) -> Optional[FIR]:
         code = callsign.split("_")[0]
-        idxs = self._fir_icao_idx.get(code)
-        if idxs:
-            return self._firs[idxs[0]]
+        idx = self._fir_icao_idx.get(code)
+        if idx is not None:
+            return self._firs[idx]
 
-        for i in range(len(callsign), 4, -1):
-            code = callsign[:i]
-            idx = self._fir_prefix_idx.get(code)
-            if idx is not None:
-                return self._firs[idx]
+        node = self._fir_prefix_trie
+        best = None
+        for ch in callsign:
+            node = node.get(ch)
+            if node is None:
+                break
+            terminal = node.get("$")
+            if terminal is not None:
+                best = terminal
+        if best is not None:
+            return self._firs[best]
 
     def find_airport_by_callsign(self, callsign: str) -> Optional[Airport]:
         code = callsign.split("_")[0]
@@ -280,19 +604,56 @@ class VatspyData:
 
     def find_airport_by_code(self, code: str) -> Optional[Airport]:
         if len(code) < 4:
-            idxs = self._airport_iata_idx.get(code)
-            if not idxs:
+            idx = _idx_first(self._airport_iata_idx, code)
+            if idx is None:
                 return None
-            return self._airports[idxs[0]]
-        idxs = self._airport_icao_idx.get(code, self._airport_iata_idx.get(code))
-        if not idxs:
+            return self._airports[idx]
+        idx = self._airport_icao_idx.get(code)
+        if idx is None:
+            idx = _idx_first(self._airport_iata_idx, code)
+        if idx is None:
             return None
-        return self._airports[idxs[0]]
+        return self._airports[idx]
+
+    def _build_fir_tree(self):
+        geoms = []
+        fir_idx = []
+        for i, fir in enumerate(self._firs):
+            if fir._geom is not None:
+                geoms.append(fir._geom.boundaries.shape)
+                fir_idx.append(i)
+        self._fir_tree = shapely.STRtree(geoms)
+        self._fir_tree_idx = fir_idx
+
+    def find_fir_containing(self, lat: float, lng: float) -> Optional[FIR]:
+        self._ensure_geometries()
+        if self._fir_tree is None:
+            self._build_fir_tree()
+
+        pt = shapely.Point(lng, lat)
+        for pos in self._fir_tree.query(pt):
+            fir = self._firs[self._fir_tree_idx[pos]]
+            if fir._geom.boundaries.shape.contains(pt):
+                return fir
+        return None
+
+    def find_airports_in_bbox(self,
+                              min_lat: float,
+                              min_lng: float,
+                              max_lat: float,
+                              max_lng: float) -> List[Airport]:
+        mask = np.logical_and.reduce([
+            self._airport_lat >= min_lat,
+            self._airport_lat <= max_lat,
+            self._airport_lng >= min_lng,
+            self._airport_lng <= max_lng,
+        ])
+        return [self._airports[i] for i in np.nonzero(mask)[0]]
 
     def find_fir_by_code(self, code: str) -> Optional[FIR]:
-        idxs = self._fir_icao_idx.get(code)
-        if idxs:
-            return self._firs[idxs[0]]
+        idx = self._fir_icao_idx.get(code)
+        if idx is not None:
+            return self._firs[idx]
 
     def find_uir_by_code(self, code: str) -> Optional[FIR]:
         idx = self._uir_icao_idx.get(code)
@@ -0,0 +1,192 @@
+# cython: language_level=3
+"""
+compiled version of the VATSpy.dat line parser
+
+mirrors _parse_data in __init__.py, which is used as a fallback when
+this extension is not built
+"""
+import sys
+from logging import getLogger
+from .types import Country, Airport, FIR, UIR, _ParseContext, _idx_add, _idx_remove
+
+log = getLogger("vatspy_data")
+
+cdef enum State:
+    STARTED
+    READ_COUNTRY
+    READ_AIRPORT
+    READ_FIR
+    READ_UIR
+    FINISHED
+
+
+cpdef object parse_data(str raw_data):
+    ctx = _ParseContext()
+    cdef list countries = ctx.countries
+    cdef dict country_name_idx = ctx.country_name_idx
+    cdef dict country_idx = ctx.country_idx
+    cdef list airports = ctx.airports
+    cdef dict airport_icao_idx = ctx.airport_icao_idx
+    cdef dict airport_iata_idx = ctx.airport_iata_idx
+    cdef list firs = ctx.firs
+    cdef dict fir_icao_idx = ctx.fir_icao_idx
+    cdef dict fir_prefix_idx = ctx.fir_prefix_idx
+    cdef list uirs = ctx.uirs
+    cdef dict uir_icao_idx = ctx.uir_icao_idx
+    cdef dict uir_fir_idx = ctx.uir_fir_idx
+
+    cdef int state = STARTED
+    cdef str raw_line, line, category
+    cdef Py_UCS4 first, last
+    cdef str name, code, custom_radar
+    cdef str icao, lat, lng, iata_raw, fir_id, is_pseudo
+    cdef str callsign_prefix, geom_id, firs_list
+    cdef object i, iata
+
+    for raw_line in raw_data.splitlines():
+        if state == FINISHED:
+            break
+
+        line = raw_line
+        if not line:
+            continue
+
+        # splitlines already ate the line terminators, so surrounding
+        # whitespace is rare and most lines skip the strip call entirely
+        first = line[0]
+        last = line[len(line) - 1]
+        if first == u" " or first == u"\t" or last == u" " or last == u"\t":
+            line = line.strip()
+            if not line:
+                continue
+            first = line[0]
+
+        if first == u";":
+            continue
+
+        if first == u"[":
+            category = line[1:-1].lower()
+            if category == "countries":
+                state = READ_COUNTRY
+            elif category == "airports":
+                state = READ_AIRPORT
+            elif category == "firs":
+                state = READ_FIR
+            elif category == "uirs":
+                state = READ_UIR
+            elif category == "idl":
+                state = FINISHED
+            else:
+                state = STARTED
+                log.error("unknown category %s", category)
+            continue
+
+        if state == READ_AIRPORT:
+            try:
+                icao, name, lat, lng, iata_raw, fir_id, is_pseudo = line.split("|")
+            except ValueError:
+                log.error("invalid airport line '%s'", line)
+                continue
+
+            iata = sys.intern(iata_raw) if iata_raw else None
+            airport = Airport(
+                icao=icao,
+                name=name,
+                lat=float(lat),
+                lng=float(lng),
+                iata=iata,
+                fir_id=sys.intern(fir_id),
+                pseudo=is_pseudo == "1"
+            )
+
+            i = airport_icao_idx.get(icao)
+            if i is None:
+                i = len(airports)
+                airports.append(airport)
+                airport_icao_idx[icao] = i
+                if iata is not None:
+                    _idx_add(airport_iata_idx, iata, i)
+            else:
+                # a repeated icao replaces the earlier record in place
+                old = airports[i]
+                airports[i] = airport
+                if old.iata != iata:
+                    if old.iata is not None:
+                        _idx_remove(airport_iata_idx, old.iata, i)
+                    if iata is not None:
+                        _idx_add(airport_iata_idx, iata, i)
+        elif state == READ_FIR:
+            try:
+                icao, name, callsign_prefix, geom_id = line.split("|")
+            except ValueError:
+                log.error("invalid FIR line '%s'", line)
+                continue
+
+            icao = sys.intern(icao)
+            callsign_prefix = sys.intern(callsign_prefix)
+            fir = FIR(
+                icao=icao,
+                name=name,
+                callsign_prefix=callsign_prefix,
+                geom_id=geom_id,
+            )
+
+            i = fir_icao_idx.get(icao)
+            if i is None:
+                i = len(firs)
+                firs.append(fir)
+                fir_icao_idx[icao] = i
+            else:
+                old = firs[i]
+                firs[i] = fir
+                if old.callsign_prefix != callsign_prefix \
+                        and fir_prefix_idx.get(old.callsign_prefix) == i:
+                    del fir_prefix_idx[old.callsign_prefix]
+            fir_prefix_idx[callsign_prefix] = i
+        elif state == READ_COUNTRY:
+            try:
+                name, code, custom_radar = line.split("|")
+            except ValueError:
+                log.error("invalid country line '%s'", line)
+                continue
+
+            code = sys.intern(code)
+            i = country_name_idx.get(name)
+            if i is None:
+                i = len(countries)
+                country_name_idx[name] = i
+                if custom_radar:
+                    countries.append(Country(name=name, codes=[code], radar_name=custom_radar))
+                else:
+                    countries.append(Country(name=name, codes=[code]))
+            else:
+                countries[i].codes.append(code)
+            country_idx[code] = i
+        elif state == READ_UIR:
+            try:
+                icao, name, firs_list = line.split("|")
+            except ValueError:
+                log.error("invalid UIR line '%s'", line)
+                continue
+
+            uir = UIR(
+                icao=icao,
+                name=name,
+                fir_ids=[sys.intern(f) for f in firs_list.split(",")]
+            )
+
+            i = uir_icao_idx.get(icao)
+            if i is None:
+                i = len(uirs)
+                uirs.append(uir)
+                uir_icao_idx[icao] = i
+            else:
+                old = uirs[i]
+                uirs[i] = uir
+                for fir_id in old.fir_ids:
+                    if uir_fir_idx.get(fir_id) == i:
+                        del uir_fir_idx[fir_id]
+            for fir_id in uir.fir_ids:
+                uir_fir_idx[fir_id] = i
+
+    return ctx
@@ -1,68 +1,93 @@
+from array import array
+from dataclasses import dataclass, field
 from enum import Enum, auto
-from typing import Optional, Dict, Any, List, Annotated
-from pydantic import BaseModel
-from pydantic.functional_validators import BeforeValidator
+from typing import Optional, Callable, Dict, Any, List, Tuple
 from shapely.geometry.base import BaseGeometry
 
 
-class Point(BaseModel):
+@dataclass(slots=True)
+class Point:
     lat: float
     lng: float
 
 
-class BoundingBox(BaseModel):
+@dataclass(slots=True)
+class BoundingBox:
     min: Point
     max: Point
 
 
-class Boundaries(BaseModel):
+@dataclass(slots=True)
+class Boundaries:
     geometry: Dict[str, Any]
+    shape: BaseGeometry
     bbox: BoundingBox
     center: Point
 
 
-class GeoItemProperties(BaseModel):
+@dataclass(slots=True)
+class GeoItemProperties:
     id: str
-    oceanic: Annotated[bool, BeforeValidator(lambda x: x == "1")]
-    label_lon: Annotated[float, BeforeValidator(lambda x: float(x))]
-    label_lat: Annotated[float, BeforeValidator(lambda x: float(x))]
+    oceanic: bool
+    label_lon: float
+    label_lat: float
     region: Optional[str]
     division: Optional[str]
 
 
-class GeoItem(BaseModel):
+@dataclass(slots=True)
+class GeoItem:
     properties: GeoItemProperties
     boundaries: Boundaries
 
-    model_config = {"arbitrary_types_allowed": True}
 
-
-class Country(BaseModel):
+@dataclass(slots=True)
+class Country:
     name: str
-    codes: List[str]
+    # accumulated as a list during parsing, frozen to a tuple afterwards
+    codes: Tuple[str, ...]
     radar_name: str = "Center"
 
 
-class Airport(BaseModel):
+@dataclass(slots=True)
+class Airport:
     icao: str
     name: str
-    lat: Annotated[float, BeforeValidator(lambda x: float(x))]
-    lng: Annotated[float, BeforeValidator(lambda x: float(x))]
+    lat: float
+    lng: float
     iata: Optional[str]
     fir_id: str
-    pseudo: Annotated[bool, BeforeValidator(lambda x: x == "1")]
+    pseudo: bool
 
 
-class FIR(BaseModel):
+@dataclass(slots=True)
+class FIR:
     icao: str
     name: str
+    geom_id: str
     callsign_prefix: Optional[str] = None
-    geom: GeoItem
+    _geom: Optional[GeoItem] = field(default=None, repr=False)
+    _loader: Optional[Callable[[], None]] = field(default=None, repr=False, compare=False)
+
+    @property
+    def geom(self) -> Optional[GeoItem]:
+        if self._geom is None and self._loader is not None:
+            self._loader()
+        return self._geom
 
-    model_config = {"arbitrary_types_allowed": True}
+    def __getstate__(self):
+        # geometries are reloadable from their own cached source,
+        # so neither them nor the loader callback get pickled
+        return self.icao, self.name, self.geom_id, self.callsign_prefix
 
+    def __setstate__(self, state):
+        self.icao, self.name, self.geom_id, self.callsign_prefix = state
+        self._geom = None
+        self._loader = None
 
-class UIR(BaseModel):
+
+@dataclass(slots=True)
+class UIR:
     icao: str
     name: str
     fir_ids: List[str]
@@ -75,3 +100,51 @@ class ParserState(Enum):
     READ_FIR = auto()
     READ_UIR = auto()
     FINISHED = auto()
+
+
+def _idx_add(idx: Dict[str, int | array], key: str, i: int):
+    # almost every key holds exactly one index, so the common case stores
+    # a bare int; the rare collision buckets are array("i") rather than
+    # lists, keeping the indexes as packed 4-byte ints
+    old = idx.get(key)
+    if old is None:
+        idx[key] = i
+    elif isinstance(old, array):
+        old.append(i)
+    else:
+        idx[key] = array("i", (old, i))
+
+
+def _idx_first(idx: Dict[str, int | array], key: str) -> Optional[int]:
+    value = idx.get(key)
+    if isinstance(value, array):
+        return value[0]
+    return value
+
+
+def _idx_remove(idx: Dict[str, int | array], key: str, i: int):
+    value = idx.get(key)
+    if isinstance(value, array):
+        if i in value:
+            value.remove(i)
+            if len(value) == 1:
+                idx[key] = value[0]
+    elif value == i:
+        del idx[key]
+
+
+@dataclass(slots=True)
+class _ParseContext:
+    """accumulates parsed records together with their indexes in a single pass"""
+    countries: List[Country] = field(default_factory=list)
+    country_name_idx: Dict[str, int] = field(default_factory=dict)
+    country_idx: Dict[str, int] = field(default_factory=dict)
+    airports: List[Airport] = field(default_factory=list)
+    airport_icao_idx: Dict[str, int] = field(default_factory=dict)
+    airport_iata_idx: Dict[str, int | array] = field(default_factory=dict)
+    firs: List[FIR] = field(default_factory=list)
+    fir_icao_idx: Dict[str, int] = field(default_factory=dict)
+    fir_prefix_idx: Dict[str, int] = field(default_factory=dict)
+    uirs: List[UIR] = field(default_factory=list)
+    uir_icao_idx: Dict[str, int] = field(default_factory=dict)
+    uir_fir_idx: Dict[str, int] = field(default_factory=dict)